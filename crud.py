@@ -1,8 +1,9 @@
 import json
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
 from . import db
 from .models import NostrAccount
+from .relay.bloom import relay_blooms
 from .relay.event import NostrEvent
 from .relay.filter import NostrFilter
 from .relay.relay import NostrRelay, RelayPublicSpec, RelaySpec
@@ -158,11 +159,17 @@ async def create_event(relay_id: str, e: NostrEvent, publisher: Optional[str]):
         ),
     )
 
-    # todo: optimize with bulk insert
-    for tag in e.tags:
-        name, value, *rest = tag
-        extra = json.dumps(rest) if rest else None
-        await create_event_tags(relay_id, e.id, name, value, extra)
+    try:
+        # todo: optimize with bulk insert
+        for tag in e.tags:
+            name, value, *rest = tag
+            extra = json.dumps(rest) if rest else None
+            await create_event_tags(relay_id, e.id, name, value, extra)
+    finally:
+        # the event row is stored even if one of its tags is not
+        bloom = relay_blooms.get(relay_id)
+        if bloom:
+            bloom.add_event(e)
 
 
 async def get_events(
@@ -182,6 +189,59 @@ async def get_events(
     return events
 
 
+async def count_bloom_values(relay_id: str) -> int:
+    """Returns the number of values `get_bloom_values()` will yield for a relay"""
+    row = await db.fetchone(
+        "SELECT COUNT(*) AS count FROM nostrrelay.events WHERE relay_id = ?",
+        (relay_id,),
+    )
+    tag_row = await db.fetchone(
+        """
+        SELECT COUNT(*) AS count FROM nostrrelay.event_tags
+        WHERE relay_id = ? AND name IN ('e', 'p')
+        """,
+        (relay_id,),
+    )
+    return 2 * row["count"] + tag_row["count"]
+
+
+async def get_bloom_values(
+    relay_id: str, page_size: int = 10000
+) -> AsyncIterator[List[Tuple[str, str]]]:
+    """
+    Yields `(name, value)` pairs for the `id`, `pubkey` and `e`/`p` tags of the events of a relay.
+    The events are read one page at a time (ordered by `id`), so they are never all in memory.
+    """
+    last_id = ""
+    while True:
+        rows = await db.fetchall(
+            f"""
+            SELECT id, pubkey FROM nostrrelay.events
+            WHERE relay_id = ? AND id > ?
+            ORDER BY id LIMIT {page_size}
+            """,
+            (relay_id, last_id),
+        )
+        if not rows:
+            return
+
+        page_last_id = rows[-1]["id"]
+        tag_rows = await db.fetchall(
+            """
+            SELECT name, value FROM nostrrelay.event_tags
+            WHERE relay_id = ? AND event_id > ? AND event_id <= ? AND name IN ('e', 'p')
+            """,
+            (relay_id, last_id, page_last_id),
+        )
+
+        values = [("id", r["id"]) for r in rows]
+        values += [("pubkey", r["pubkey"]) for r in rows]
+        values += [(r["name"], r["value"]) for r in tag_rows]
+        yield values
+
+        last_id = page_last_id
+
+
 async def get_event(relay_id: str, id: str) -> Optional[NostrEvent]:
     row = await db.fetchone(
         "SELECT * FROM nostrrelay.events WHERE relay_id = ? AND id = ?",
@@ -198,6 +258,14 @@ async def get_event(relay_id: str, id: str) -> Optional[NostrEvent]:
     return event
 
 
+async def event_exists(relay_id: str, id: str) -> bool:
+    row = await db.fetchone(
+        "SELECT 1 FROM nostrrelay.events WHERE relay_id = ? AND id = ?",
+        (relay_id, id),
+    )
+    return row is not None
+
+
 async def get_storage_for_public_key(relay_id: str, publisher_pubkey: str) -> int:
     """Returns the storage space in bytes for all the events of a public key. Deleted events are also counted"""
 
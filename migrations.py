@@ -1,3 +1,6 @@
+from lnbits.db import SQLITE
+
+
 async def m001_initial(db):
     """
     Initial nostrrelays tables.
@@ -62,3 +65,49 @@ async def m001_initial(db):
         );
         """
     )
+
+
+async def m002_indexes(db):
+    """
+    Indexes for the event queries and the tag joins.
+    """
+
+    indexes = [
+        ("idx_event_tags_event", "event_tags (relay_id, event_id)", ""),
+        (
+            "idx_event_tags_name_value",
+            "event_tags (relay_id, name, value, event_id)",
+            "",
+        ),
+        (
+            "idx_events_relay_created",
+            "events (relay_id, created_at DESC)",
+            "WHERE deleted = false",
+        ),
+        (
+            "idx_events_relay_kind_created",
+            "events (relay_id, kind, created_at DESC)",
+            "WHERE deleted = false",
+        ),
+    ]
+    for name, table_columns, where in indexes:
+        await db.execute(_create_index_sql(db, name, table_columns, where))
+
+
+async def m003_pubkey_index(db):
+    """
+    Index for the `authors` filters (full public keys and prefix ranges).
+    """
+
+    await db.execute(
+        _create_index_sql(
+            db, "idx_events_relay_pubkey", "events (relay_id, pubkey, created_at)", ""
+        )
+    )
+
+
+def _create_index_sql(db, name: str, table_columns: str, where: str) -> str:
+    # SQLite expects the schema on the index name, Postgres on the table name
+    if db.type == SQLITE:
+        return f"CREATE INDEX nostrrelay.{name} ON {table_columns} {where};"
+    return f"CREATE INDEX {name} ON nostrrelay.{table_columns} {where};"
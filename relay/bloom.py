@@ -0,0 +1,61 @@
+from hashlib import blake2b
+from typing import Dict, Iterable, List
+
+from .event import NostrEvent
+
+
+class RelayBloom:
+    """
+    Bloom filter over the `id`, `pubkey` and `e`/`p` tag values of the events stored by a relay.
+    It can only say for sure that a value is NOT stored, so it never replaces the DB query.
+
+    It is sized for `capacity` distinct values (~1% false positives with 10 bits per value).
+    Past that it is saturated and is no longer used, since most checks would be positive.
+    """
+
+    def __init__(self, capacity: int = 100000, hash_count: int = 7):
+        self.capacity = capacity
+        self.hash_count = hash_count
+        self.size_bits = 1 << (capacity * 10 - 1).bit_length()
+        self.is_ready = False  # set after the events already in the DB have been added
+        self._bits = bytearray(self.size_bits // 8)
+        self._count = 0
+
+    @property
+    def is_usable(self) -> bool:
+        return self.is_ready and self._count <= self.capacity
+
+    def add(self, name: str, value: str):
+        is_new = False
+        for i in self._positions(name, value):
+            if not self._bits[i >> 3] & (1 << (i & 7)):
+                self._bits[i >> 3] |= 1 << (i & 7)
+                is_new = True
+        if is_new:
+            self._count += 1
+
+    def contains(self, name: str, value: str) -> bool:
+        for i in self._positions(name, value):
+            if not self._bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    def contains_any(self, name: str, values: Iterable[str]) -> bool:
+        return any(self.contains(name, v) for v in values)
+
+    def add_event(self, e: NostrEvent):
+        self.add("id", e.id)
+        self.add("pubkey", e.pubkey)
+        for tag in e.tags:
+            if len(tag) > 1 and tag[0] in ["e", "p"]:
+                self.add(tag[0], tag[1])
+
+    def _positions(self, name: str, value: str) -> List[int]:
+        # Kirsch-Mitzenmacher: all the bit positions are derived from two hashes
+        digest = blake2b(f"{name}:{value}".encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+
+relay_blooms: Dict[str, RelayBloom] = {}
@@ -10,13 +10,15 @@ from lnbits.helpers import urlsafe_short_hash
 from ..crud import (
     create_event,
     delete_events,
+    event_exists,
     get_event,
     get_events,
     mark_events_deleted,
 )
+from .bloom import relay_blooms
 from .event import NostrEvent, NostrEventType
 from .event_validator import EventValidator
-from .filter import NostrFilter
+from .filter import HEX_KEY_LENGTH, NostrFilter
 from .relay import RelaySpec
 
 
@@ -139,13 +141,25 @@ class NostrClientConnection:
             await self._send_msg(resp_nip20)
             return None
 
-        publisher_pubkey = self.pubkey if self.pubkey else e.pubkey
-        valid, message = await self.event_validator.validate_write(e, publisher_pubkey)
+        valid, message = self.event_validator.validate_event(e)
+        is_stored_event = False
+        if valid and not e.is_ephemeral_event:
+            is_stored_event = await self._is_duplicate_event(e)
+            publisher_pubkey = self.pubkey if self.pubkey else e.pubkey
+            valid, message = await self.event_validator.validate_storage(
+                publisher_pubkey, e.size_bytes, is_stored_event
+            )
         if not valid:
             resp_nip20 += [valid, message]
             await self._send_msg(resp_nip20)
             return None
 
+        if is_stored_event:
+            # same response as when the insert fails for an existing event
+            resp_nip20 += [True, "error: failed to create event"]
+            await self._send_msg(resp_nip20)
+            return None
+
         try:
             if e.is_replaceable_event:
                 await delete_events(
@@ -168,6 +182,13 @@ class NostrClientConnection:
 
         await self._send_msg(resp_nip20)
 
+    async def _is_duplicate_event(self, e: NostrEvent) -> bool:
+        """The DB is only queried if the relay's bloom filter cannot rule the event out."""
+        bloom = relay_blooms.get(self.relay_id)
+        if bloom and bloom.is_usable and not bloom.contains("id", e.id):
+            return False
+        return await event_exists(self.relay_id, e.id)
+
     @property
     def config(self) -> RelaySpec:
         if not self.get_client_config:
@@ -179,8 +200,15 @@ class NostrClientConnection:
 
     async def _handle_delete_event(self, event: NostrEvent):
         # NIP 09
-        filter = NostrFilter(authors=[event.pubkey])
-        filter.ids = [t[1] for t in event.tags if t[0] == "e"]
+        # only exact ids, the filter would treat shorter values as prefixes
+        tagged_ids = [
+            t[1]
+            for t in event.tags
+            if len(t) > 1 and t[0] == "e" and len(t[1]) == HEX_KEY_LENGTH
+        ]
+        if len(tagged_ids) == 0:
+            return None
+        filter = NostrFilter(authors=[event.pubkey], ids=tagged_ids)
         events_to_delete = await get_events(self.relay_id, filter, False)
         ids = [e.id for e in events_to_delete if not e.is_delete_event]
         await mark_events_deleted(self.relay_id, NostrFilter(ids=ids))
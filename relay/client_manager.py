@@ -1,6 +1,14 @@
-from typing import List
+import asyncio
+from typing import Dict, List
 
-from ..crud import get_config_for_all_active_relays
+from loguru import logger
+
+from ..crud import (
+    count_bloom_values,
+    get_bloom_values,
+    get_config_for_all_active_relays,
+)
+from .bloom import RelayBloom, relay_blooms
 from .client_connection import NostrClientConnection
 from .event import NostrEvent
 from .relay import RelaySpec
@@ -11,6 +19,7 @@ class NostrClientManager:
         self._clients: dict = {}
         self._active_relays: dict = {}
         self._is_ready = False
+        self._bloom_tasks: Dict[str, asyncio.Task] = {}
 
     async def add_client(self, c: NostrClientConnection) -> bool:
         if not self._is_ready:
@@ -34,15 +43,22 @@ class NostrClientManager:
     async def init_relays(self):
         self._active_relays = await get_config_for_all_active_relays()
         self._is_ready = True
+        for relay_id in self._active_relays:
+            self._init_bloom(relay_id)
 
     async def enable_relay(self, relay_id: str, config: RelaySpec):
         self._is_ready = True
         self._active_relays[relay_id] = config
+        self._init_bloom(relay_id)
 
     async def disable_relay(self, relay_id: str):
         await self._stop_clients_for_relay(relay_id)
         if relay_id in self._active_relays:
             del self._active_relays[relay_id]
+        if relay_id in self._bloom_tasks:
+            self._bloom_tasks[relay_id].cancel()
+        if relay_id in relay_blooms:
+            del relay_blooms[relay_id]
 
     def get_relay_config(self, relay_id: str) -> RelaySpec:
         return self._active_relays[relay_id]
@@ -61,6 +77,30 @@ class NostrClientManager:
             if client.relay_id == relay_id:
                 await client.stop(reason=f"Relay '{relay_id}' has been deactivated.")
 
+    def _init_bloom(self, relay_id: str):
+        if relay_id in relay_blooms or relay_id in self._bloom_tasks:
+            return
+        # the bloom is not used until `is_ready`, no need to make the clients wait for it
+        task = asyncio.create_task(self._load_bloom(relay_id))
+        self._bloom_tasks[relay_id] = task
+        task.add_done_callback(lambda _: self._bloom_tasks.pop(relay_id, None))
+
+    async def _load_bloom(self, relay_id: str):
+        try:
+            # leave room for the relay to grow before the bloom saturates
+            value_count = await count_bloom_values(relay_id)
+            bloom = RelayBloom(capacity=max(2 * value_count, 100000))
+
+            # register the bloom before reading the events, so events created meanwhile are not missed
+            relay_blooms[relay_id] = bloom
+            async for values in get_bloom_values(relay_id):
+                for name, value in values:
+                    bloom.add(name, value)
+            bloom.is_ready = True
+        except Exception as ex:
+            logger.warning(ex)
+            relay_blooms.pop(relay_id, None)
+
     async def _allow_client(self, c: NostrClientConnection) -> bool:
         if c.relay_id not in self._active_relays:
             await c.stop(reason=f"Relay '{c.relay_id}' is not active")
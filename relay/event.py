@@ -2,10 +2,71 @@ import hashlib
 import json
 from enum import Enum
 from sqlite3 import Row
-from typing import List
+from typing import Dict, FrozenSet, List, Optional, Set
 
-from pydantic import BaseModel
-from secp256k1 import PublicKey
+from pydantic import BaseModel, PrivateAttr
+from secp256k1 import ffi, lib, secp256k1_ctx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _xonly_pubkey(pubkey: bytes):
+    if len(pubkey) != 32:
+        raise ValueError("Public key must have 32 bytes")
+    xonly_pubkey = ffi.new("secp256k1_xonly_pubkey *")
+    if not lib.secp256k1_xonly_pubkey_parse(secp256k1_ctx, xonly_pubkey, pubkey):
+        raise ValueError("Public key is not valid")
+    return xonly_pubkey
+
+
+def _schnorr_verify(msg: bytes, xonly_pubkey, sig: bytes) -> bool:
+    """
+    Calls libsecp256k1 directly with the context shared by the `secp256k1` module,
+    so no `PublicKey` object (and no full public key parsing) is needed per event.
+    """
+    if len(sig) != 64:
+        return False
+    return bool(
+        lib.secp256k1_schnorrsig_verify(secp256k1_ctx, sig, msg, len(msg), xonly_pubkey)
+    )
+
+
+def _json_bytes(data) -> bytes:
+    """Compact JSON encoded as UTF-8, with non-ASCII characters not escaped (as NIP-01 requires)."""
+    if orjson:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass  # eg: integers larger than 64 bits, `json` handles them
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _sha256_event_id(
+    pubkey: str, created_at: int, kind: int, tags: List[List[str]], content: str
+) -> str:
+    """
+    Same as hashing the compact JSON of `[0, pubkey, created_at, kind, tags, content]`,
+    but the pieces are fed to the hash one by one instead of building the full string first.
+    When `orjson` is available the whole array is encoded at once, which is faster still.
+    """
+    if orjson:
+        try:
+            data = orjson.dumps([0, pubkey, created_at, kind, tags, content])
+            return hashlib.sha256(data).hexdigest()
+        except TypeError:
+            pass
+
+    h = hashlib.sha256(b"[0,")
+    h.update(json.dumps(pubkey, ensure_ascii=False).encode())
+    h.update(f",{created_at},{kind},".encode())
+    h.update(json.dumps(tags, separators=(",", ":"), ensure_ascii=False).encode())
+    h.update(b",")
+    h.update(json.dumps(content, ensure_ascii=False).encode())
+    h.update(b"]")
+    return h.hexdigest()
 
 
 class NostrEventType(str, Enum):
@@ -24,23 +85,40 @@ class NostrEvent(BaseModel):
     content: str = ""
     sig: str
 
+    # computed on first use, reset when a field is assigned
+    _event_id: Optional[str] = PrivateAttr(None)
+    _size_bytes: Optional[int] = PrivateAttr(None)
+    _tag_sets: Optional[Dict[str, FrozenSet[str]]] = PrivateAttr(None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__fields__:
+            object.__setattr__(self, "_event_id", None)
+            object.__setattr__(self, "_size_bytes", None)
+            object.__setattr__(self, "_tag_sets", None)
+
     def serialize(self) -> List:
         return [0, self.pubkey, self.created_at, self.kind, self.tags, self.content]
 
     def serialize_json(self) -> str:
-        e = self.serialize()
-        return json.dumps(e, separators=(",", ":"), ensure_ascii=False)
+        return self.serialize_bytes().decode()
+
+    def serialize_bytes(self) -> bytes:
+        return _json_bytes(self.serialize())
 
     @property
     def event_id(self) -> str:
-        data = self.serialize_json()
-        id = hashlib.sha256(data.encode()).hexdigest()
-        return id
+        if self._event_id is None:
+            self._event_id = _sha256_event_id(
+                self.pubkey, self.created_at, self.kind, self.tags, self.content
+            )
+        return self._event_id
 
     @property
     def size_bytes(self) -> int:
-        s = json.dumps(dict(self), separators=(",", ":"), ensure_ascii=False)
-        return len(s.encode())
+        if self._size_bytes is None:
+            self._size_bytes = len(_json_bytes(self.__dict__))
+        return self._size_bytes
 
     @property
     def is_replaceable_event(self) -> bool:
@@ -73,30 +151,46 @@ class NostrEvent(BaseModel):
                 f"Invalid event id. Expected: '{event_id}' got '{self.id}'"
             )
         try:
-            pub_key = PublicKey(bytes.fromhex("02" + self.pubkey), True)
-        except Exception:
+            xonly_pubkey = _xonly_pubkey(bytes.fromhex(self.pubkey))
+        except ValueError:
             raise ValueError(
                 f"Invalid public key: '{self.pubkey}' for event '{self.id}'"
             )
 
-        valid_signature = pub_key.schnorr_verify(
-            bytes.fromhex(event_id), bytes.fromhex(self.sig), None, raw=True
+        valid_signature = _schnorr_verify(
+            bytes.fromhex(event_id), xonly_pubkey, bytes.fromhex(self.sig)
         )
         if not valid_signature:
             raise ValueError(f"Invalid signature: '{self.sig}' for event '{self.id}'")
 
     def serialize_response(self, subscription_id):
-        return [NostrEventType.EVENT, subscription_id, dict(self)]
+        # `__dict__` holds exactly the event fields, no need to copy them for each subscriber
+        return [NostrEventType.EVENT, subscription_id, self.__dict__]
 
     def tag_values(self, tag_name: str) -> List[str]:
         return [t[1] for t in self.tags if t[0] == tag_name]
 
+    def tag_set(self, tag_name: str) -> FrozenSet[str]:
+        """
+        Same values as `tag_values()`, but as a set that is built only once.
+        A broadcast event is checked against the filters of every client.
+        """
+        if self._tag_sets is None:
+            tag_sets: Dict[str, Set[str]] = {}
+            for t in self.tags:
+                if len(t) > 1:
+                    tag_sets.setdefault(t[0], set()).add(t[1])
+            self._tag_sets = {name: frozenset(v) for name, v in tag_sets.items()}
+        return self._tag_sets.get(tag_name, frozenset())
+
     def has_tag_value(self, tag_name: str, tag_value: str) -> bool:
-        return tag_value in self.tag_values(tag_name)
+        return tag_value in self.tag_set(tag_name)
 
     def is_direct_message_for_pubkey(self, pubkey: str) -> bool:
         return self.is_direct_message and self.has_tag_value("p", pubkey)
 
     @classmethod
     def from_row(cls, row: Row) -> "NostrEvent":
-        return cls(**dict(row))
+        # stored events have already been validated, skip the pydantic validation
+        data = dict(row)
+        return cls.construct(**{k: data[k] for k in cls.__fields__ if k in data})
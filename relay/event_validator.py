@@ -17,26 +17,10 @@ class EventValidator:
 
         self.get_client_config: Optional[Callable[[], RelaySpec]] = None
 
-    async def validate_write(
-        self, e: NostrEvent, publisher_pubkey: str
-    ) -> Tuple[bool, str]:
-        valid, message = self._validate_event(e)
-        if not valid:
-            return (valid, message)
-
-        if e.is_ephemeral_event:
-            return True, ""
-
-        valid, message = await self._validate_storage(publisher_pubkey, e.size_bytes)
-        if not valid:
-            return (valid, message)
-
-        return True, ""
-
     def validate_auth_event(
         self, e: NostrEvent, auth_challenge: Optional[str]
     ) -> Tuple[bool, str]:
-        valid, message = self._validate_event(e)
+        valid, message = self.validate_event(e)
         if not valid:
             return (valid, message)
 
@@ -59,7 +43,7 @@ class EventValidator:
             raise Exception("EventValidator not ready!")
         return self.get_client_config()
 
-    def _validate_event(self, e: NostrEvent) -> Tuple[bool, str]:
+    def validate_event(self, e: NostrEvent) -> Tuple[bool, str]:
         if self._exceeded_max_events_per_hour():
             return False, f"Exceeded max events per hour limit'!"
 
@@ -74,8 +58,8 @@ class EventValidator:
 
         return True, ""
 
-    async def _validate_storage(
-        self, pubkey: str, event_size_bytes: int
+    async def validate_storage(
+        self, pubkey: str, event_size_bytes: int, is_stored_event: bool = False
     ) -> Tuple[bool, str]:
         if self.config.is_read_only_relay:
             return False, "Cannot write event, relay is read-only"
@@ -93,6 +77,10 @@ class EventValidator:
         if not account.can_join and self.config.is_paid_relay:
             return False, f"This is a paid relay: '{self.relay_id}'"
 
+        if is_stored_event:
+            # nothing will be written, no storage to check
+            return True, ""
+
         stored_bytes = await get_storage_for_public_key(self.relay_id, pubkey)
         total_available_storage = account.storage + self.config.free_storage_bytes_value
         if (stored_bytes + event_size_bytes) <= total_available_storage:
@@ -126,10 +114,13 @@ class EventValidator:
 
     def _created_at_in_range(self, created_at: int) -> Tuple[bool, str]:
         current_time = round(time.time())
-        if self.config.created_at_in_past != 0:
-            if created_at < (current_time - self.config.created_at_in_past):
+        config = self.config
+        created_at_in_past = config.created_at_in_past
+        created_at_in_future = config.created_at_in_future
+        if created_at_in_past != 0:
+            if created_at < (current_time - created_at_in_past):
                 return False, "created_at is too much into the past"
-        if self.config.created_at_in_future != 0:
-            if created_at > (current_time + self.config.created_at_in_future):
+        if created_at_in_future != 0:
+            if created_at > (current_time + created_at_in_future):
                 return False, "created_at is too much into the future"
         return True, ""
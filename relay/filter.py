@@ -1,9 +1,47 @@
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
+from .bloom import relay_blooms
 from .event import NostrEvent
 
+HEX_KEY_LENGTH = 64  # event ids and public keys
+
+
+def _padded_placeholders(values: List[Any]) -> Tuple[str, List[Any]]:
+    """
+    Pad the values up to the next power of two by repeating the last one (no sentinel can be
+    guaranteed to never match). This keeps the number of distinct SQL texts small, so the
+    prepared statements can be reused.
+    """
+    size = 1 << (len(values) - 1).bit_length()
+    return ",".join(["?"] * size), values + [values[-1]] * (size - len(values))
+
+
+def _in_or_prefix_range(column: str, values: List[str]) -> Tuple[str, List[Any]]:
+    """
+    Full length hex values are matched with `IN`. Shorter values are prefixes and are matched
+    with a `>= prefix AND < prefix + 'g'` range, so the index on the column can still be used.
+    """
+    clauses: List[str] = []
+    clause_values: List[Any] = []
+
+    full_values = [v for v in values if len(v) >= HEX_KEY_LENGTH]
+    if len(full_values):
+        placeholders, padded_values = _padded_placeholders(full_values)
+        clauses.append(f"{column} IN ({placeholders})")
+        clause_values += padded_values
+
+    for prefix in [v for v in values if len(v) < HEX_KEY_LENGTH]:
+        clauses.append(f"({column} >= ? AND {column} < ?)")
+        clause_values += [prefix, prefix + "g"]  # 'g' sorts after any hex digit
+
+    return f"({' OR '.join(clauses)})", clause_values
+
+
+def _all_full_length(values: List[str]) -> bool:
+    return len(values) != 0 and all(len(v) >= HEX_KEY_LENGTH for v in values)
+
 
 class NostrFilter(BaseModel):
     subscription_id: Optional[str]
@@ -17,40 +55,58 @@ class NostrFilter(BaseModel):
     until: Optional[int]
     limit: Optional[int]
 
+    # built on first use, reset when a field is assigned
+    _tag_sets: Optional[Dict[str, FrozenSet[str]]] = PrivateAttr(None)
+    _predicates: Optional[List[Callable[[NostrEvent], bool]]] = PrivateAttr(None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__fields__:
+            object.__setattr__(self, "_tag_sets", None)
+            object.__setattr__(self, "_predicates", None)
+
     def matches(self, e: NostrEvent) -> bool:
-        # todo: starts with
-        if len(self.ids) != 0 and e.id not in self.ids:
-            return False
-        if len(self.authors) != 0 and e.pubkey not in self.authors:
-            return False
-        if len(self.kinds) != 0 and e.kind not in self.kinds:
-            return False
+        for predicate in self._get_predicates():
+            if not predicate(e):
+                return False
+        return True
 
-        if self.since and e.created_at < self.since:
-            return False
-        if self.until and self.until > 0 and e.created_at > self.until:
-            return False
+    def _get_predicates(self) -> List[Callable[[NostrEvent], bool]]:
+        """Only the checks for the fields that are set, with the filter values already prepared."""
+        if self._predicates is not None:
+            return self._predicates
 
-        found_e_tag = self.tag_in_list(e.tags, "e")
-        found_p_tag = self.tag_in_list(e.tags, "p")
-        if not found_e_tag or not found_p_tag:
-            return False
+        predicates: List[Callable[[NostrEvent], bool]] = []
+        # `ids` and `authors` can be prefixes
+        if len(self.ids) != 0:
+            ids = tuple(self.ids)
+            predicates.append(lambda e: e.id.startswith(ids))
+        if len(self.authors) != 0:
+            authors = tuple(self.authors)
+            predicates.append(lambda e: e.pubkey.startswith(authors))
+        if len(self.kinds) != 0:
+            kinds = frozenset(self.kinds)
+            predicates.append(lambda e: e.kind in kinds)
 
-        return True
+        since, until = self.since, self.until
+        if since:
+            predicates.append(lambda e: e.created_at >= since)
+        if until and until > 0:
+            predicates.append(lambda e: e.created_at <= until)
 
-    def tag_in_list(self, event_tags, tag_name) -> bool:
-        filter_tags = dict(self).get(tag_name, [])
-        if len(filter_tags) == 0:
-            return True
+        e_tags, p_tags = self._tag_values("e"), self._tag_values("p")
+        if e_tags:
+            predicates.append(lambda e: not e_tags.isdisjoint(e.tag_set("e")))
+        if p_tags:
+            predicates.append(lambda e: not p_tags.isdisjoint(e.tag_set("p")))
 
-        event_tag_values = [t[1] for t in event_tags if t[0] == tag_name]
+        self._predicates = predicates
+        return predicates
 
-        common_tags = [
-            event_tag for event_tag in event_tag_values if event_tag in filter_tags
-        ]
-        if len(common_tags) == 0:
-            return False
-        return True
+    def _tag_values(self, tag_name: str) -> FrozenSet[str]:
+        if self._tag_sets is None:
+            self._tag_sets = {"e": frozenset(self.e), "p": frozenset(self.p)}
+        return self._tag_sets.get(tag_name, frozenset())
 
     def is_empty(self):
         return (
@@ -63,6 +119,25 @@ class NostrFilter(BaseModel):
             and (not self.until)
         )
 
+    def may_match_relay(self, relay_id: str) -> bool:
+        """False if the relay's bloom filter proves that no stored event can match"""
+        bloom = relay_blooms.get(relay_id)
+        if not bloom or not bloom.is_usable:
+            return True
+
+        # prefixes cannot be checked against the bloom filter
+        if _all_full_length(self.ids) and not bloom.contains_any("id", self.ids):
+            return False
+        if _all_full_length(self.authors) and not bloom.contains_any(
+            "pubkey", self.authors
+        ):
+            return False
+        if len(self.e) and not bloom.contains_any("e", self.e):
+            return False
+        if len(self.p) and not bloom.contains_any("p", self.p):
+            return False
+        return True
+
     def enforce_limit(self, limit: int):
         if not self.limit or self.limit > limit:
             self.limit = limit
@@ -70,40 +145,43 @@ class NostrFilter(BaseModel):
     def to_sql_components(
         self, relay_id: str
     ) -> Tuple[List[str], List[str], List[Any]]:
+        if not self.may_match_relay(relay_id):
+            return [], ["0=1"], []
+
         inner_joins: List[str] = []
         where = ["deleted=false", "nostrrelay.events.relay_id = ?"]
         values: List[Any] = [relay_id]
 
         if len(self.e):
-            values += self.e
-            e_s = ",".join(["?"] * len(self.e))
+            e_s, e_values = _padded_placeholders(self.e)
+            values += e_values
             inner_joins.append(
-                "INNER JOIN nostrrelay.event_tags e_tags ON nostrrelay.events.id = e_tags.event_id"
+                "INNER JOIN nostrrelay.event_tags e_tags ON nostrrelay.events.id = e_tags.event_id AND nostrrelay.events.relay_id = e_tags.relay_id"
             )
             where.append(f" (e_tags.value in ({e_s}) AND e_tags.name = 'e')")
 
         if len(self.p):
-            values += self.p
-            p_s = ",".join(["?"] * len(self.p))
+            p_s, p_values = _padded_placeholders(self.p)
+            values += p_values
             inner_joins.append(
-                "INNER JOIN nostrrelay.event_tags p_tags ON nostrrelay.events.id = p_tags.event_id"
+                "INNER JOIN nostrrelay.event_tags p_tags ON nostrrelay.events.id = p_tags.event_id AND nostrrelay.events.relay_id = p_tags.relay_id"
             )
             where.append(f" p_tags.value in ({p_s}) AND p_tags.name = 'p'")
 
         if len(self.ids) != 0:
-            ids = ",".join(["?"] * len(self.ids))
-            where.append(f"id IN ({ids})")
-            values += self.ids
+            ids, ids_values = _in_or_prefix_range("id", self.ids)
+            where.append(ids)
+            values += ids_values
 
         if len(self.authors) != 0:
-            authors = ",".join(["?"] * len(self.authors))
-            where.append(f"pubkey IN ({authors})")
-            values += self.authors
+            authors, authors_values = _in_or_prefix_range("pubkey", self.authors)
+            where.append(authors)
+            values += authors_values
 
         if len(self.kinds) != 0:
-            kinds = ",".join(["?"] * len(self.kinds))
+            kinds, kinds_values = _padded_placeholders(self.kinds)
             where.append(f"kind IN ({kinds})")
-            values += self.kinds
+            values += kinds_values
 
         if self.since:
             where.append("created_at >= ?")
@@ -1,11 +1,12 @@
 import asyncio
 from json import dumps, loads
-from typing import Optional
+from typing import Optional, Tuple
 
 import pytest
 from fastapi import WebSocket
 from loguru import logger
 
+from lnbits.extensions.nostrrelay.relay.bloom import relay_blooms  # type: ignore
 from lnbits.extensions.nostrrelay.relay.client_connection import (  # type: ignore
     NostrClientConnection,
 )
@@ -19,6 +20,7 @@ from .helpers import get_fixtures
 fixtures = get_fixtures("clients")
 alice = fixtures["alice"]
 bob = fixtures["bob"]
+carol = fixtures["carol"]
 
 RELAY_ID = "relay_01"
 
@@ -71,6 +73,80 @@ async def test_alice_and_bob():
     await alice_deletes_post01__bob_is_notified(ws_alice, ws_bob)
 
 
+@pytest.mark.asyncio
+async def test_resend_stored_event():
+    relay_id = "relay_02"
+    client_manager, ws = await init_client(relay_id)
+
+    bloom = relay_blooms[relay_id]
+    assert bloom.is_ready, "Relay bloom not loaded for empty relay"
+
+    post = alice["post02"]
+    response_duplicate = ["OK", post[1]["id"], True, "error: failed to create event"]
+    response_paid = ["OK", post[1]["id"], False, f"This is a paid relay: '{relay_id}'"]
+
+    response = await wire_and_get_response(ws, post)
+    assert response == dumps(alice["post02_response_ok"]), "Wrong confirmation"
+
+    for is_ready in [True, False]:
+        bloom.is_ready = is_ready
+        response = await wire_and_get_response(ws, post)
+        assert response == dumps(response_duplicate), "Expected duplicate response"
+
+    # access checks apply to stored events too
+    await client_manager.enable_relay(relay_id, RelaySpec(is_paid_relay=True))
+    for is_ready in [True, False]:
+        bloom.is_ready = is_ready
+        response = await wire_and_get_response(ws, post)
+        assert response == dumps(response_paid), "Expected paid relay rejection"
+
+
+@pytest.mark.asyncio
+async def test_delete_with_empty_or_short_e_tag():
+    _, ws = await init_client("relay_03")
+
+    response = await wire_and_get_response(ws, carol["post01"])
+    assert response == dumps(carol["post01_response_ok"]), "Wrong confirmation"
+
+    response = await wire_and_get_response(ws, carol["delete_empty_tag"])
+    assert response == dumps(
+        carol["delete_empty_tag_response"]
+    ), "Wrong confirmation for delete with empty 'e' tag"
+
+    response = await wire_and_get_response(ws, carol["delete_short_tag"])
+    assert response == dumps(
+        carol["delete_short_tag_response"]
+    ), "Wrong confirmation for delete with short 'e' tag"
+
+    ws.sent_messages.clear()
+    await ws.wire_mock_data(carol["request_posts_carol"])
+    await asyncio.sleep(0.1)
+    assert ws.sent_messages == [
+        dumps(["EVENT", "posts_carol", carol["post01"][1]]),
+        dumps(["EOSE", "posts_carol"]),
+    ], "Carol: post01 must not be deleted by an empty or short 'e' tag"
+
+
+async def init_client(relay_id: str) -> Tuple[NostrClientManager, MockWebSocket]:
+    client_manager = NostrClientManager()
+    await client_manager.enable_relay(relay_id, RelaySpec())
+
+    ws = MockWebSocket()
+    client = NostrClientConnection(relay_id=relay_id, websocket=ws)
+    await client_manager.add_client(client)
+    asyncio.create_task(client.start())
+    await asyncio.sleep(0.1)
+    return client_manager, ws
+
+
+async def wire_and_get_response(ws: MockWebSocket, data: list) -> str:
+    ws.sent_messages.clear()
+    await ws.wire_mock_data(data)
+    await asyncio.sleep(0.1)
+    assert len(ws.sent_messages) == 1, "Expected one response"
+    return ws.sent_messages[0]
+
+
 async def init_clients():
     client_manager = NostrClientManager()
     await client_manager.enable_relay(RELAY_ID, RelaySpec())
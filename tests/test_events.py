@@ -10,6 +10,10 @@ from lnbits.extensions.nostrrelay.crud import (  # type: ignore
     get_event,
     get_events,
 )
+from lnbits.extensions.nostrrelay.relay.bloom import (  # type: ignore
+    RelayBloom,
+    relay_blooms,
+)
 from lnbits.extensions.nostrrelay.relay.event import NostrEvent  # type: ignore
 from lnbits.extensions.nostrrelay.relay.filter import NostrFilter  # type: ignore
 
@@ -51,6 +55,136 @@ def test_invalid_event_id_and_signature(invalid_events: List[EventFixture]):
             f.data.check_signature()
 
 
+def test_relay_bloom(valid_events: List[EventFixture]):
+    bloom = RelayBloom()
+    for f in valid_events:
+        bloom.add_event(f.data)
+
+    for f in valid_events:
+        assert bloom.contains("id", f.data.id), f"Missing id for '{f.name}'"
+        assert bloom.contains("pubkey", f.data.pubkey), f"Missing pubkey '{f.name}'"
+        for tag in f.data.tags:
+            if tag[0] in ["e", "p"]:
+                assert bloom.contains(tag[0], tag[1]), f"Missing tag for '{f.name}'"
+
+    assert not bloom.contains("id", "00" * 32)
+    assert not bloom.contains("pubkey", valid_events[0].data.id)
+
+
+def test_filter_skipped_by_relay_bloom(valid_events: List[EventFixture]):
+    relay_id = "bloom_r1"
+    bloom = RelayBloom()
+    for f in valid_events:
+        bloom.add_event(f.data)
+    relay_blooms[relay_id] = bloom
+    try:
+        event = valid_events[0].data
+        absent = "00" * 32
+
+        # not loaded yet
+        assert NostrFilter(ids=[absent]).may_match_relay(relay_id)
+
+        bloom.is_ready = True
+        assert NostrFilter(ids=[event.id]).may_match_relay(relay_id)
+        assert NostrFilter(authors=[event.pubkey]).may_match_relay(relay_id)
+        assert not NostrFilter(ids=[absent]).may_match_relay(relay_id)
+        assert not NostrFilter(authors=[absent]).may_match_relay(relay_id)
+        assert NostrFilter(ids=[absent]).to_sql_components(relay_id) == (
+            [],
+            ["0=1"],
+            [],
+        )
+
+        # prefixes cannot be checked against the bloom
+        assert NostrFilter(ids=[absent[:8]]).may_match_relay(relay_id)
+        assert NostrFilter(ids=[absent[:8], absent]).may_match_relay(relay_id)
+    finally:
+        del relay_blooms[relay_id]
+
+
+@pytest.mark.asyncio
+async def test_relay_bloom_crud(valid_events: List[EventFixture]):
+    relay_id = "bloom_r2"
+    bloom = RelayBloom()
+    bloom.is_ready = True  # empty relay
+    relay_blooms[relay_id] = bloom
+    try:
+        event = valid_events[0].data
+        filter = NostrFilter(ids=[event.id])
+        assert await get_events(relay_id, filter) == []
+
+        await create_event(relay_id, event, None)
+        assert bloom.contains("id", event.id), "Event not added to the bloom"
+
+        events = await get_events(relay_id, filter)
+        assert len(events) == 1, "Failed to query event added to the bloom"
+
+        absent_author = NostrFilter(authors=["00" * 32])
+        assert await get_events(relay_id, absent_author) == []
+    finally:
+        del relay_blooms[relay_id]
+
+
+@pytest.mark.asyncio
+async def test_relay_bloom_crud_malformed_tag():
+    relay_id = "bloom_r3"
+    bloom = RelayBloom()
+    bloom.is_ready = True  # empty relay
+    relay_blooms[relay_id] = bloom
+    try:
+        event = NostrEvent(
+            id="11" * 32,
+            pubkey="22" * 32,
+            created_at=1675242172,
+            kind=1,
+            tags=[["p", "33" * 32], ["t"]],
+            content="malformed tag",
+            sig="44" * 64,
+        )
+        # the event row is stored before the tags
+        with pytest.raises(ValueError):
+            await create_event(relay_id, event, None)
+
+        events = await get_events(relay_id, NostrFilter(ids=[event.id]))
+        assert len(events) == 1, "Failed to query event with malformed tag by id"
+
+        events = await get_events(relay_id, NostrFilter(authors=[event.pubkey]))
+        assert len(events) == 1, "Failed to query event with malformed tag by author"
+    finally:
+        del relay_blooms[relay_id]
+
+
+@pytest.mark.asyncio
+async def test_filter_by_tag_e_not_padded_with_empty_value(
+    valid_events: List[EventFixture],
+):
+    relay_id = "padding_r1"
+    event_id = "3219eec7427e365585d5adf26f5d2dd2709d3f0f2c0e1f79dc9021e951c67d96"
+    empty_tag_event = NostrEvent(
+        id="55" * 32,
+        pubkey="66" * 32,
+        created_at=1675242172,
+        kind=1,
+        tags=[["e", ""]],
+        content="empty e tag",
+        sig="77" * 64,
+    )
+    await create_event(relay_id, empty_tag_event, None)
+    for f in valid_events:
+        await create_event(relay_id, f.data, None)
+
+    # lengths that are not a power of two are padded
+    for length in [3, 5, 6, 7]:
+        filter = NostrFilter()
+        filter.e.extend([f"{i:064x}" for i in range(1, length)] + [event_id])
+
+        events = await get_events(relay_id, filter)
+        assert len(events) == 2, f"Failed to query by {length} 'e' tags"
+        assert empty_tag_event.id not in [
+            e.id for e in events
+        ], f"Empty 'e' tag matched by {length} 'e' tags"
+
+
 @pytest.mark.asyncio
 async def test_valid_event_crud(valid_events: List[EventFixture]):
     author = "a24496bca5dd73300f4e5d5d346c73132b7354c597fcbb6509891747b4689211"
@@ -68,6 +202,8 @@ async def test_valid_event_crud(valid_events: List[EventFixture]):
 
     await filter_by_author(all_events, author)
 
+    await filter_by_author_prefix(all_events, author)
+
     await filter_by_tag_p(all_events, author)
 
     await filter_by_tag_e(all_events, event_id)
@@ -110,6 +246,15 @@ async def filter_by_author(all_events: List[NostrEvent], author):
     assert len(filtered_events) == 5, f"Failed to filter by authors"
 
 
+async def filter_by_author_prefix(all_events: List[NostrEvent], author):
+    filter = NostrFilter(authors=[author[:8]])
+    events_by_author = await get_events(RELAY_ID, filter)
+    assert len(events_by_author) == 5, f"Failed to query by author prefix"
+
+    filtered_events = [e for e in all_events if filter.matches(e)]
+    assert len(filtered_events) == 5, f"Failed to filter by author prefix"
+
+
 async def filter_by_tag_p(all_events: List[NostrEvent], author):
     # todo: check why constructor does not work for fields with aliases (#e, #p)
     filter = NostrFilter()